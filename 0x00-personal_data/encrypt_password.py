@@ -3,13 +3,39 @@
 Module for password encryption and validation.
 """
 
+import os
+import asyncio
+import threading
 import bcrypt
+from collections import deque
+from itertools import islice
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
-def hash_password(password: str) -> bytes:
+def _default_rounds() -> int:
+    """
+    Returns the bcrypt cost factor set by BCRYPT_ROUNDS (default 12).
+    """
+    try:
+        return int(os.getenv("BCRYPT_ROUNDS", 12))
+    except ValueError:
+        return 12
+
+def hash_password(password: str, rounds: Optional[int] = None) -> bytes:
     """
     Hashes a password using bcrypt.
+
+    Args:
+        password (str): The password to hash.
+        rounds (int): The bcrypt cost factor (log2 of the number of
+            iterations), BCRYPT_ROUNDS or 12 by default. Every +1 doubles
+            the hashing time.
+
+    Returns:
+        bytes: The salted hash.
     """
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds if rounds is not None else _default_rounds())
     return bcrypt.hashpw(password.encode(), salt)
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
@@ -24,3 +50,213 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
         bool: True if the password is valid, False otherwise.
     """
     return bcrypt.checkpw(password.encode(), hashed_password)
+
+class HasherOverloaded(RuntimeError):
+    """
+    Raised when a PasswordHasher already has too many pending requests.
+    """
+
+class PasswordHasher:
+    """
+    Hashing service running hash_password and is_valid on a bounded pool.
+
+    bcrypt releases the GIL, so a thread pool (default) hashes on all
+    cores; processes=True uses a process pool instead. At most `workers`
+    hashes run at once, the others wait in the pool queue. Admission
+    control keeps that queue short: once `max_pending` requests are
+    running or waiting, new ones raise HasherOverloaded right away instead
+    of queueing behind a login storm, so the caller can answer 503 and
+    the threads serving other requests are not tied up.
+
+    submit_hash()/submit_verify() return concurrent.futures futures;
+    hash()/verify() are their asyncio-awaitable versions.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None,
+                 rounds: Optional[int] = None, processes: bool = False):
+        self.workers = workers or os.cpu_count() or 1
+        if max_pending is None:
+            max_pending = self.workers * 4
+        self.max_pending = max_pending
+        self.rounds = rounds if rounds is not None else _default_rounds()
+        self.rejected = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self._executor: Executor = pool(max_workers=self.workers)
+
+    def _done(self, future: Future) -> None:
+        """
+        Releases the admission slot of a finished request.
+        """
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn, *args) -> Future:
+        """
+        Admits a request and submits it to the pool.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherOverloaded(
+                    f"{self._pending} password hashing requests pending")
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def submit_hash(self, password: str) -> Future:
+        """
+        Hashes a password in the pool; returns a future of the hash.
+        """
+        return self._submit(hash_password, password, self.rounds)
+
+    def submit_verify(self, hashed_password: bytes, password: str) -> Future:
+        """
+        Checks a password in the pool; returns a future of the result.
+        """
+        return self._submit(is_valid, hashed_password, password)
+
+    async def hash(self, password: str) -> bytes:
+        """
+        Awaitable version of submit_hash.
+        """
+        return await asyncio.wrap_future(self.submit_hash(password))
+
+    async def verify(self, hashed_password: bytes, password: str) -> bool:
+        """
+        Awaitable version of submit_verify.
+        """
+        future = self.submit_verify(hashed_password, password)
+        return await asyncio.wrap_future(future)
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of requests running or waiting in the pool.
+        """
+        return self._pending
+
+    def stats(self) -> dict:
+        """
+        Pool size, pending requests and requests rejected so far.
+        """
+        return {"workers": self.workers, "max_pending": self.max_pending,
+                "pending": self._pending, "rejected": self.rejected,
+                "rounds": self.rounds}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the pool, waiting for the pending requests by default.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "PasswordHasher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Returns the PasswordHasher of the process, creating it on first use.
+
+    Configured with PASSWORD_HASH_WORKERS (default: number of CPUs),
+    PASSWORD_HASH_MAX_PENDING (default: 4 per worker) and BCRYPT_ROUNDS.
+    """
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            workers = os.getenv("PASSWORD_HASH_WORKERS")
+            max_pending = os.getenv("PASSWORD_HASH_MAX_PENDING")
+            _hasher = PasswordHasher(
+                workers=int(workers) if workers else None,
+                max_pending=int(max_pending) if max_pending else None
+            )
+        return _hasher
+
+def _hash_chunk(passwords: List[str], rounds: Optional[int]) -> List[bytes]:
+    """
+    Hashes a chunk of passwords (hash_many worker).
+    """
+    return [hash_password(password, rounds) for password in passwords]
+
+def _verify_chunk(pairs: List[Tuple[bytes, str]]) -> List[bool]:
+    """
+    Checks a chunk of (hashed_password, password) pairs (verify_many worker).
+    """
+    return [is_valid(hashed_password, password)
+            for hashed_password, password in pairs]
+
+def _map_chunks(fn: Callable, items: Iterable, args: tuple,
+                workers: Optional[int], chunk_size: int,
+                processes: bool) -> Iterator:
+    """
+    Applies a chunk function to `items` on a pool, yielding results in order.
+
+    Items are read lazily and at most two chunks per worker are in flight,
+    so any number of items can be streamed in bounded memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, chunk_size)
+    items = iter(items)
+    pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool(max_workers=workers) as executor:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < workers * 2:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    break
+                in_flight.append(executor.submit(fn, chunk, *args))
+            if not in_flight:
+                return
+            yield from in_flight.popleft().result()
+
+def hash_many(passwords: Iterable[str], rounds: Optional[int] = None,
+              workers: Optional[int] = None, chunk_size: int = 16,
+              processes: bool = False) -> Iterator[bytes]:
+    """
+    Hashes many passwords in parallel.
+
+    Args:
+        passwords (Iterable[str]): The passwords to hash, read lazily.
+        rounds (int): The bcrypt cost factor, BCRYPT_ROUNDS by default.
+        workers (int): The pool size, the number of CPUs by default.
+        chunk_size (int): The number of passwords per pool task.
+        processes (bool): Use a process pool instead of threads.
+
+    Returns:
+        Iterator[bytes]: The hashes, in the order of `passwords`.
+    """
+    return _map_chunks(_hash_chunk, passwords, (rounds,), workers,
+                       chunk_size, processes)
+
+def verify_many(pairs: Iterable[Tuple[bytes, str]],
+                workers: Optional[int] = None, chunk_size: int = 16,
+                processes: bool = False) -> Iterator[bool]:
+    """
+    Checks many passwords against their hashes in parallel.
+
+    Args:
+        pairs (Iterable[Tuple[bytes, str]]): The (hashed_password, password)
+            pairs to check, read lazily.
+        workers (int): The pool size, the number of CPUs by default.
+        chunk_size (int): The number of pairs per pool task.
+        processes (bool): Use a process pool instead of threads.
+
+    Returns:
+        Iterator[bool]: is_valid of every pair, in the order of `pairs`.
+    """
+    return _map_chunks(_verify_chunk, pairs, (), workers, chunk_size,
+                       processes)
@@ -5,37 +5,271 @@ Module for filtering and logging sensitive information.
 
 import os
 import re
+import copy
+import sys
+import json
+import time
+import queue
+import shutil
 import logging
+import argparse
+import tempfile
+import threading
+import multiprocessing
 import mysql.connector
-from typing import List
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import (Callable, Iterator, List, Optional, Pattern, TextIO,
+                    Tuple, Union)
 from mysql.connector.connection import MySQLConnection
 
-def filter_datum(fields: List[str], redaction: str, message: str, separator: str) -> str:
+@lru_cache(maxsize=128)
+def _redaction_pattern(fields: Tuple[str, ...], separator: str) -> Pattern:
+    """
+    Compiles one alternation pattern matching any of the fields.
+    """
+    alternation = "|".join(fields)
+    return re.compile(f"({alternation})=[^{separator}]+")
+
+def filter_datum(fields: List[str], redaction: str, message: str,
+                 separator: str) -> str:
     """
     Obfuscates fields in a log message.
+
+    The message is scanned once, with a pattern compiled once per
+    (fields, separator) combination.
     """
-    for field in fields:
-        message = re.sub(f"{field}=[^{separator}]+", f"{field}={redaction}", message)
-    return message
+    if not fields:
+        return message
+    pattern = _redaction_pattern(tuple(fields), separator)
+    replacement = "=" + redaction
+    return pattern.sub(lambda match: match.group(1) + replacement, message)
 
 class RedactingFormatter(logging.Formatter):
-    """ Redacting Formatter class for logging sensitive information. """
+    """
+    Redacting Formatter class for logging sensitive information.
+
+    Plain messages are formatted, then redacted with filter_datum. Records
+    carrying structured data, as in
+        logger.info("user", extra={"fields": {"name": name, "ip": ip}})
+    are redacted by key instead: the values of the sensitive keys are
+    replaced before serialization, with no regex scan. With output="kv"
+    (default) they are serialized as "key=value; key=value", with
+    output="json" every record is a JSON line.
+    """
 
     REDACTION = "***"
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
+    OUTPUTS = ("kv", "json")
 
-    def __init__(self, fields: List[str]):
+    def __init__(self, fields: List[str], output: str = "kv"):
         super(RedactingFormatter, self).__init__(self.FORMAT)
+        if output not in self.OUTPUTS:
+            raise ValueError(f"Unknown output: {output}")
         self.fields = fields
+        self.output = output
+        self._redacted = frozenset(fields)
+
+    def redact(self, data: dict) -> dict:
+        """
+        Returns a copy of structured data with the sensitive values redacted.
+        """
+        redacted = self._redacted
+        return {key: self.REDACTION if key in redacted else value
+                for key, value in data.items()}
+
+    def serialize(self, data: dict) -> str:
+        """
+        Redacts structured data and serializes it as "key=value; key=value".
+        """
+        redacted = self._redacted
+        return "; ".join(
+            f"{key}={self.REDACTION if key in redacted else value}"
+            for key, value in data.items()
+        )
+
+    def _redact_message(self, message: str) -> str:
+        """
+        Redacts a plain message with filter_datum.
+        """
+        return filter_datum(self.fields, self.REDACTION, message,
+                            self.SEPARATOR)
+
+    def _json_line(self, record: logging.LogRecord, message: str,
+                   data: Optional[dict]) -> str:
+        """
+        Serializes a record as a JSON object.
+        """
+        line = {"name": record.name, "level": record.levelname,
+                "asctime": self.formatTime(record)}
+        if message:
+            line["message"] = message
+        if data is not None:
+            line["fields"] = self.redact(data)
+        if record.exc_info:
+            line["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
 
     def format(self, record: logging.LogRecord) -> str:
-        original_message = super().format(record)
-        return filter_datum(self.fields, self.REDACTION, original_message, self.SEPARATOR)
+        data = getattr(record, "fields", None)
+        if not isinstance(data, dict):
+            if self.output == "json":
+                message = self._redact_message(record.getMessage())
+                return self._json_line(record, message, None)
+            original_message = super().format(record)
+            return self._redact_message(original_message)
+
+        if self.output == "json":
+            return self._json_line(record, "", data)
+        # same steps as logging.Formatter.format, with the serialized data
+        # as the message (record.msg is left to the other handlers)
+        record.message = self.serialize(data)
+        record.asctime = self.formatTime(record, self.datefmt)
+        formatted = self.formatMessage(record)
+        if record.exc_info:
+            formatted += "\n" + self.formatException(record.exc_info)
+        return formatted
+
+    def format_batch(self, messages: List[Union[str, dict]], name: str,
+                     level: int = logging.INFO) -> str:
+        """
+        Formats and redacts a batch of messages logged at the same time.
+
+        Messages are strings, redacted with filter_datum, or structured
+        data (dicts), redacted by key. The log prefix is formatted once for
+        the whole batch; returns one line per message.
+        """
+        record = logging.LogRecord(name, level, __file__, 0, "", None, None)
+        if self.output == "json":
+            return "".join(
+                self._json_line(record, "", message) + "\n"
+                if isinstance(message, dict) else
+                self._json_line(record, self._redact_message(message),
+                                None) + "\n"
+                for message in messages
+            )
+        prefix = super().format(record)
+        return "".join(
+            prefix + self.serialize(message) + "\n"
+            if isinstance(message, dict) else
+            self._redact_message(prefix + message) + "\n"
+            for message in messages
+        )
+
+class RedactingQueueHandler(logging.Handler):
+    """
+    Non-blocking logging handler built around RedactingFormatter.
+
+    emit() only puts the record on a bounded queue; a background thread
+    redacts, formats and writes the records to the stream in batches.
+    When the queue is full, the overflow policy decides:
+        - "block": wait for room in the queue
+        - "drop": drop the record
+        - "sample": drop the record, and once the queue is half full
+          also keep only one record out of `sample_rate`
+    Dropped records are counted in `dropped`.
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop", "sample")
+    _STOP = object()
+
+    def __init__(self, fields: List[str], stream=None, maxsize: int = 10000,
+                 overflow: str = "block", sample_rate: int = 10,
+                 batch_size: int = 256):
+        super(RedactingQueueHandler, self).__init__()
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.setFormatter(RedactingFormatter(fields))
+        self.stream = stream if stream is not None else sys.stderr
+        self.queue = queue.Queue(maxsize)
+        self.overflow = overflow
+        self.sample_rate = max(1, sample_rate)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._sampled = 0
+        self._counters_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run,
+                                        name="redacting-log-writer",
+                                        daemon=True)
+        self._worker.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Queues a record for the background writer.
+        """
+        try:
+            # freeze the message now: its arguments may change after
+            # emit(); on a copy, as other handlers share the record
+            message = record.getMessage()
+            record = copy.copy(record)
+            record.msg = message
+            record.args = None
+            if self.overflow == "block":
+                self.queue.put(record)
+                return
+            if self.overflow == "sample" and \
+                    self.queue.qsize() >= self.queue.maxsize // 2:
+                with self._counters_lock:
+                    self._sampled += 1
+                    if self._sampled % self.sample_rate != 0:
+                        self.dropped += 1
+                        return
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                with self._counters_lock:
+                    self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _run(self) -> None:
+        """
+        Background writer: redacts and writes the queued records in batches.
+        """
+        stop = False
+        while not stop:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [r for r in batch if r is not self._STOP]
+            stop = len(records) != len(batch)
+            try:
+                if records:
+                    lines = [self.format(r) for r in records]
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                    self.written += len(records)
+            except Exception:
+                self.handleError(records[0])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self) -> None:
+        """
+        Waits until every queued record has been written.
+        """
+        if self._worker.is_alive():
+            self.queue.join()
+
+    def close(self) -> None:
+        """
+        Writes the queued records, then stops the background writer.
+        """
+        if self._worker.is_alive():
+            self.queue.put(self._STOP)
+            self._worker.join()
+        super(RedactingQueueHandler, self).close()
 
 def get_db() -> MySQLConnection:
     """
-    Connects to the MySQL database using credentials from environment variables.
+    Connects to the MySQL database using credentials from environment
+    variables.
     """
     username = os.getenv("PERSONAL_DATA_DB_USERNAME", "root")
     password = os.getenv("PERSONAL_DATA_DB_PASSWORD", "")
@@ -49,37 +283,383 @@ def get_db() -> MySQLConnection:
         database=database
     )
 
-def main() -> None:
+class ConnectionPool:
+    """
+    Pool of database connections, reused instead of connecting each time.
+
+    At most `size` connections are checked out at once; acquire() waits up
+    to `timeout` seconds for one to be released, then raises TimeoutError.
+    Idle connections are reused most recently released first, pinged on
+    checkout (broken ones are replaced) and closed once idle for more than
+    `recycle` seconds, before the server drops them. Released connections
+    are rolled back, so no transaction leaks to the next user. `connect`
+    opens a new connection (get_db by default).
+    """
+
+    def __init__(self, connect: Callable[[], MySQLConnection] = None,
+                 size: int = 5, timeout: float = 30.0,
+                 recycle: float = 300.0):
+        self.connect = connect or get_db
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pid = os.getpid()
+        self.created = 0
+        self.recycled = 0
+        self.broken = 0
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    @staticmethod
+    def _healthy(conn: MySQLConnection) -> bool:
+        """
+        Checks that a connection still reaches the server.
+        """
+        try:
+            conn.ping(reconnect=False)
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def _discard(conn: MySQLConnection) -> None:
+        """
+        Closes a connection, ignoring errors of already broken ones.
+        """
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self) -> MySQLConnection:
+        """
+        Checks out a healthy connection, reusing an idle one if possible.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(
+                f"no database connection available after {self.timeout}s "
+                f"(pool size {self.size})")
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, released_at = self._idle.pop()
+                if time.monotonic() - released_at > self.recycle:
+                    self.recycled += 1
+                    self._discard(conn)
+                elif self._healthy(conn):
+                    return conn
+                else:
+                    self.broken += 1
+                    self._discard(conn)
+            conn = self.connect()
+            self.created += 1
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: MySQLConnection) -> None:
+        """
+        Returns a checked out connection to the pool.
+        """
+        try:
+            conn.rollback()
+        except Exception:
+            self.broken += 1
+            self._discard(conn)
+            conn = None
+        stale = []
+        with self._lock:
+            now = time.monotonic()
+            if conn is not None:
+                self._idle.append((conn, now))
+            # oldest connections are at the bottom of the stack
+            while self._idle and now - self._idle[0][1] > self.recycle:
+                stale.append(self._idle.pop(0)[0])
+        self._slots.release()
+        self.recycled += len(stale)
+        for conn in stale:
+            self._discard(conn)
+
+    def close(self) -> None:
+        """
+        Closes the idle connections; checked out ones are closed on release.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.recycle = -1
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """
+        Pool size, idle connections and connections opened/closed so far.
+        """
+        return {"size": self.size, "idle": len(self._idle),
+                "created": self.created,
+                "recycled": self.recycled, "broken": self.broken}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_db_pool(connect: Callable[[], MySQLConnection] = None
+                ) -> ConnectionPool:
+    """
+    Returns the connection pool of the process, creating it on first use.
+
+    Configured with PERSONAL_DATA_DB_POOL_SIZE (default 5),
+    PERSONAL_DATA_DB_POOL_TIMEOUT (seconds to wait for a connection,
+    default 30) and PERSONAL_DATA_DB_POOL_RECYCLE (seconds a connection
+    may stay idle, default 300). `connect` replaces get_db to open the
+    connections. A forked child gets its own pool, as connections can't
+    be shared across processes.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(
+                connect,
+                size=int(os.getenv("PERSONAL_DATA_DB_POOL_SIZE", 5)),
+                timeout=float(os.getenv("PERSONAL_DATA_DB_POOL_TIMEOUT", 30)),
+                recycle=float(os.getenv("PERSONAL_DATA_DB_POOL_RECYCLE", 300))
+            )
+        return _pool
+
+@contextmanager
+def pooled_connection() -> Iterator[MySQLConnection]:
+    """
+    Checks out a connection from get_db_pool() for the duration of a with
+    block.
+    """
+    pool = get_db_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+USER_COLUMNS = ("name", "email", "phone", "ssn", "password", "ip",
+                "last_login", "user_agent")
+
+def _read_checkpoint(checkpoint_path: Optional[str]):
+    """
+    Returns the last exported key saved in a checkpoint file, if any.
+    """
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as f:
+        return json.load(f)
+
+def _write_checkpoint(checkpoint_path: str, last_key) -> None:
+    """
+    Atomically saves the last exported key to a checkpoint file.
+    """
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(last_key, f, default=str)
+    os.replace(tmp_path, checkpoint_path)
+
+def export_users(db: MySQLConnection, sink: TextIO, fields: List[str],
+                 batch_size: int = 1000, key_column: Optional[str] = None,
+                 checkpoint_path: Optional[str] = None,
+                 progress: Optional[Callable[[int], None]] = None,
+                 key_range: Optional[Tuple[int, int]] = None,
+                 output: str = "kv") -> int:
+    """
+    Streams the users table to `sink` with the sensitive fields redacted.
+
+    Rows are read from an unbuffered cursor (streamed by the server) with
+    fetchmany(batch_size), and each batch is redacted and written with a
+    single write. With a `key_column`, rows are exported in key order and
+    the last exported key is saved to `checkpoint_path` after each batch,
+    so an interrupted export resumes after it; the checkpoint is removed
+    once the export completes. `progress` is called with the number of
+    rows exported so far after each batch. `key_range` (lo, hi) limits
+    the export to the rows with lo <= key_column < hi. Rows are redacted
+    by column name (no regex) and written as "key=value" lines, or JSON
+    lines with output="json".
+
+    Returns:
+        int: the number of rows exported.
+    """
+    formatter = RedactingFormatter(fields, output)
+    columns = ", ".join(USER_COLUMNS)
+    params = ()
+    if key_column is None:
+        query = f"SELECT {columns} FROM users"
+    else:
+        query = f"SELECT {key_column}, {columns} FROM users"
+        clauses = []
+        last_key = _read_checkpoint(checkpoint_path)
+        if last_key is not None:
+            clauses.append(f"{key_column} > %s")
+            params += (last_key,)
+        if key_range is not None:
+            clauses.append(f"{key_column} >= %s AND {key_column} < %s")
+            params += tuple(key_range)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {key_column}"
+
+    count = 0
+    cursor = db.cursor(buffered=False)
+    try:
+        cursor.execute(query + ";", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if key_column is not None:
+                last_key = rows[-1][0]
+                rows = [row[1:] for row in rows]
+            messages = [dict(zip(USER_COLUMNS, row)) for row in rows]
+            sink.write(formatter.format_batch(messages, "user_data"))
+            count += len(rows)
+            if key_column is not None and checkpoint_path:
+                sink.flush()
+                _write_checkpoint(checkpoint_path, last_key)
+            if progress is not None:
+                progress(count)
+    finally:
+        cursor.close()
+
+    sink.flush()
+    if key_column is not None and checkpoint_path and \
+            os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return count
+
+def _export_shard(args: Tuple[List[str], str, int, Tuple[int, int], str,
+                              str]) -> Tuple[str, int]:
+    """
+    Worker of export_users_parallel: exports one key range of the users
+    table, on its own connection, to a temporary file.
+
+    Returns:
+        Tuple[str, int]: the temporary file path and the number of rows.
+    """
+    fields, key_column, batch_size, key_range, tmp_dir, output = args
+    db = get_db()
+    try:
+        with tempfile.NamedTemporaryFile("w", dir=tmp_dir, suffix=".log",
+                                         delete=False) as f:
+            count = export_users(db, f, fields, batch_size=batch_size,
+                                 key_column=key_column, key_range=key_range,
+                                 output=output)
+    finally:
+        db.close()
+    return f.name, count
+
+def export_users_parallel(sink: TextIO, fields: List[str], workers: int,
+                          key_column: str = "id", batch_size: int = 1000,
+                          shards_per_worker: int = 4,
+                          progress: Optional[Callable[[int], None]] = None,
+                          output: str = "kv") -> int:
+    """
+    Exports the users table like export_users, using `workers` processes.
+
+    The table is split into ranges of its integer `key_column` (usually
+    the primary key), `shards_per_worker` ranges per worker so that an
+    uneven key distribution doesn't leave workers idle. Each worker
+    streams and redacts its ranges on its own get_db() connection into
+    temporary files, which are appended to `sink` in key order as they
+    complete, so the output is the same as a sequential export ordered
+    by `key_column`.
+
+    Returns:
+        int: the number of rows exported.
+    """
+    db = get_db()
+    try:
+        cursor = db.cursor()
+        cursor.execute(
+            f"SELECT MIN({key_column}), MAX({key_column}) FROM users;")
+        low, high = cursor.fetchone()
+        cursor.close()
+    finally:
+        db.close()
+    if low is None:
+        return 0
+
+    low, high = int(low), int(high) + 1
+    shards = max(1, min(workers * shards_per_worker, high - low))
+    step = -(-(high - low) // shards)
+    ranges = [(start, min(start + step, high))
+              for start in range(low, high, step)]
+
+    count = 0
+    with tempfile.TemporaryDirectory(prefix="user_data_export_") as tmp_dir:
+        tasks = [(list(fields), key_column, batch_size, key_range, tmp_dir,
+                  output) for key_range in ranges]
+        with multiprocessing.Pool(workers) as pool:
+            for path, shard_count in pool.imap(_export_shard, tasks):
+                with open(path) as f:
+                    shutil.copyfileobj(f, sink)
+                os.remove(path)
+                count += shard_count
+                if progress is not None:
+                    progress(count)
+    sink.flush()
+    return count
+
+def main(argv: Optional[List[str]] = None) -> None:
     """
     Main function to retrieve all rows in the users table and display each row
     in a filtered format.
+
+    Tuned with PERSONAL_DATA_EXPORT_BATCH (rows per fetch),
+    PERSONAL_DATA_EXPORT_KEY (key column for ordered, resumable exports),
+    PERSONAL_DATA_EXPORT_CHECKPOINT (checkpoint file) and
+    PERSONAL_DATA_EXPORT_PROGRESS=1 (progress on stdout). Lines are
+    "key=value" by default, JSON with PERSONAL_DATA_EXPORT_FORMAT=json. With
+    --workers N > 1, the table is exported by N processes, split on the
+    key column (PERSONAL_DATA_EXPORT_KEY, "id" by default).
     """
+    parser = argparse.ArgumentParser(
+        description="Export the users table with personal data redacted.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of export processes (default: 1)")
+    args = parser.parse_args(argv)
+
     # Sensitive fields that need to be redacted
     sensitive_fields = ["name", "email", "phone", "ssn", "password"]
 
-    # Set up logger
-    logger = logging.getLogger("user_data")
-    logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler()
-    handler.setFormatter(RedactingFormatter(sensitive_fields))
-    logger.addHandler(handler)
+    try:
+        batch_size = int(os.getenv("PERSONAL_DATA_EXPORT_BATCH", 1000))
+    except ValueError:
+        batch_size = 1000
+    output = os.getenv("PERSONAL_DATA_EXPORT_FORMAT", "kv")
+    progress = None
+    if os.getenv("PERSONAL_DATA_EXPORT_PROGRESS") == "1":
+        def progress(count: int) -> None:
+            print(f"{count} rows exported", flush=True)
 
-    # Connect to the database and retrieve user data
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT name, email, phone, ssn, password, ip, last_login, user_agent FROM users;")
-
-    # Log each row with sensitive fields redacted
-    for row in cursor:
-        record = (
-            f"name={row[0]}; email={row[1]}; phone={row[2]}; ssn={row[3]}; "
-            f"password={row[4]}; ip={row[5]}; last_login={row[6]}; user_agent={row[7]}"
+    if args.workers > 1:
+        export_users_parallel(
+            sys.stderr, sensitive_fields, args.workers,
+            key_column=os.getenv("PERSONAL_DATA_EXPORT_KEY", "id"),
+            batch_size=batch_size,
+            progress=progress,
+            output=output
         )
-        logger.info(record)
+        return
 
-    # Close the cursor and database connection
-    cursor.close()
-    db.close()
+    # Connect to the database and stream the redacted rows
+    db = get_db()
+    try:
+        export_users(
+            db, sys.stderr, sensitive_fields,
+            batch_size=batch_size,
+            key_column=os.getenv("PERSONAL_DATA_EXPORT_KEY"),
+            checkpoint_path=os.getenv("PERSONAL_DATA_EXPORT_CHECKPOINT"),
+            progress=progress,
+            output=output
+        )
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     main()
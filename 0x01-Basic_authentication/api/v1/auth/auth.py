@@ -1,12 +1,43 @@
 #!/usr/bin/env python3
 """Auth module for the API"""
 from flask import request
+from functools import wraps
 from typing import List, TypeVar
 from fnmatch import fnmatch
 
 
+CURRENT_USER_KEY = "api.v1.auth.current_user"
+
+
+def per_request(current_user):
+    """
+    Memoize a current_user method in the WSGI environ of the request,
+    so it is resolved once per request however many times it is called.
+    """
+    @wraps(current_user)
+    def wrapper(self, request=None):
+        environ = getattr(request, 'environ', None)
+        if not isinstance(environ, dict):
+            return current_user(self, request)
+        memo = environ.get(CURRENT_USER_KEY)
+        if memo is not None and memo[0] is self:
+            return memo[1]
+        user = current_user(self, request)
+        environ[CURRENT_USER_KEY] = (self, user)
+        return user
+    return wrapper
+
+
 class Auth():
     """Auth Class"""
+    def __init_subclass__(cls, **kwargs):
+        """
+        Memoize the current_user override of a subclass per request.
+        """
+        super().__init_subclass__(**kwargs)
+        if 'current_user' in cls.__dict__:
+            cls.current_user = per_request(cls.__dict__['current_user'])
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Return True if authentication is required, False otherwise.
@@ -36,6 +67,7 @@ class Auth():
         else:
             return request.headers.get('Authorization')
 
+    @per_request
     def current_user(self, request=None) -> TypeVar('User'):
         """
         Retrieves the current user.
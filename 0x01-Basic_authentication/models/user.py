@@ -1,8 +1,90 @@
 #!/usr/bin/env python3
 """ User module
 """
-import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
 from models.base import Base
+import hashlib
+import hmac
+import threading
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+
+BCRYPT_ROUNDS = int(getenv("BCRYPT_ROUNDS", "12"))
+
+_rehash_lock = threading.Lock()
+_rehash_pending = set()
+_rehash_executor = None
+
+
+def _hash_password(pwd: str) -> str:
+    """ Hash of a password: bcrypt ("$2b$<cost>$...") when the bcrypt
+    package is installed, legacy unsalted SHA256 (hex) otherwise
+    """
+    if bcrypt is None:
+        return hashlib.sha256(pwd.encode()).hexdigest().lower()
+    return bcrypt.hashpw(pwd.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+
+def _check_password(hashed: str, pwd: str) -> bool:
+    """ Check a password against a hash of any supported version
+    """
+    if hashed.startswith("$2"):
+        if bcrypt is None:
+            return False
+        try:
+            return bcrypt.checkpw(pwd.encode(), hashed.encode())
+        except ValueError:
+            return False
+    pwd_e = pwd.encode()
+    return hmac.compare_digest(hashlib.sha256(pwd_e).hexdigest().lower(),
+                               hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """ Whether a hash should be upgraded: legacy SHA256, or bcrypt with a
+    cost lower than BCRYPT_ROUNDS (always False without bcrypt)
+    """
+    if bcrypt is None or hashed is None:
+        return False
+    if not hashed.startswith("$2"):
+        return True
+    try:
+        return int(hashed.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _rehash(cls: type, user_id: str, old_hash: str, pwd: str) -> None:
+    """ Replace the password hash of a user, unless it changed meanwhile
+    """
+    try:
+        new_hash = _hash_password(pwd)
+        user = cls.get(user_id)
+        if user is not None and user._password == old_hash:
+            user._password = new_hash
+            user.save()
+    finally:
+        with _rehash_lock:
+            _rehash_pending.discard(user_id)
+
+
+def _schedule_rehash(user: 'User', pwd: str) -> None:
+    """ Rehash the password of a user in the background, once at a time
+    """
+    global _rehash_executor
+    with _rehash_lock:
+        if user.id in _rehash_pending:
+            return
+        _rehash_pending.add(user.id)
+        if _rehash_executor is None:
+            _rehash_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="password-rehash")
+    _rehash_executor.submit(_rehash, user.__class__, user.id,
+                            user.password, pwd)
 
 
 class User(Base):
@@ -26,22 +108,35 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hash with bcrypt (SHA256 without the
+        bcrypt package)
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = _hash_password(pwd)
 
     def is_valid_password(self, pwd: str) -> bool:
         """ Validate a password
+
+        Passwords stored with a stale hash (legacy SHA256, lower bcrypt
+        cost) are rehashed in the background once validated, so logins
+        are not slowed down by the upgrade.
         """
         if pwd is None or type(pwd) is not str:
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        if not _check_password(self.password, pwd):
+            return False
+        if needs_rehash(self.password):
+            _schedule_rehash(self, pwd)
+        return True
+
+    def needs_rehash(self) -> bool:
+        """ Whether the password hash should be upgraded
+        """
+        return needs_rehash(self.password)
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
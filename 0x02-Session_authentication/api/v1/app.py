@@ -3,6 +3,7 @@
 Route module for the API
 """
 from os import getenv
+from api.v1.auth.auth import compile_excluded_paths
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
@@ -13,6 +14,10 @@ app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 auth = None
 AUTH_TYPE = getenv("AUTH_TYPE")
+EXCLUDED_PATHS = compile_excluded_paths(('/api/v1/status/',
+                                         '/api/v1/unauthorized/',
+                                         '/api/v1/forbidden/',
+                                         '/api/v1/auth_session/login/'))
 
 if AUTH_TYPE == "auth":
     from api.v1.auth.auth import Auth
@@ -29,6 +34,9 @@ elif AUTH_TYPE == "session_exp_auth":
 elif AUTH_TYPE == "session_db_auth":
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
+elif AUTH_TYPE == "signed_session_auth":
+    from api.v1.auth.signed_session_auth import SignedSessionAuth
+    auth = SignedSessionAuth()
 
 
 @app.errorhandler(404)
@@ -60,22 +68,18 @@ def before_request() -> str:
     if auth is None:
         return
 
-    excluded_paths = ['/api/v1/status/',
-                      '/api/v1/unauthorized/',
-                      '/api/v1/forbidden/',
-                      '/api/v1/auth_session/login/']
-
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
         return
 
     if auth.authorization_header(request) is None \
        and auth.session_cookie(request) is None:
         abort(401)
 
-    if auth.current_user(request) is None:
+    current_user = auth.current_user(request)
+    if current_user is None:
         abort(403)
 
-    request.current_user = auth.current_user(request)
+    request.current_user = current_user
 
 
 if __name__ == "__main__":
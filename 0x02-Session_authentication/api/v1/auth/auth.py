@@ -2,41 +2,107 @@
 """ Module of Authentication
 """
 from flask import request
-from typing import List, TypeVar
+from functools import lru_cache, wraps
+from typing import List, TypeVar, Tuple
 from os import getenv
 
 
+CURRENT_USER_KEY = "api.v1.auth.current_user"
+
+
+class ExcludedPaths:
+    """ Excluded paths compiled for require_auth
+
+    Paths ending with '*' are prefixes, stored in a character trie; the
+    others are exact paths (ending with '/') in a set. Recent decisions
+    are kept in an LRU cache.
+    """
+    _END = ''
+
+    def __init__(self, excluded_paths: List[str]):
+        """Constructor"""
+        self.exact = set()
+        self.prefixes = {}
+        for exc in excluded_paths:
+            if len(exc) == 0:
+                continue
+            if exc[-1] != '*':
+                self.exact.add(exc)
+                continue
+            node = self.prefixes
+            for char in exc[:-1]:
+                node = node.setdefault(char, {})
+            node[self._END] = True
+        self.is_excluded = lru_cache(maxsize=1024)(self._is_excluded)
+
+    def _is_excluded(self, path: str) -> bool:
+        """ True if the path matches an exact path or a prefix """
+        tmp_path = path if path[-1] == '/' else path + '/'
+        if tmp_path in self.exact:
+            return True
+        node = self.prefixes
+        for char in path:
+            if self._END in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return self._END in node
+
+
+@lru_cache(maxsize=64)
+def compile_excluded_paths(excluded_paths: Tuple[str]) -> ExcludedPaths:
+    """ Compile (once per distinct tuple) a list of excluded paths """
+    return ExcludedPaths(excluded_paths)
+
+
+def per_request(current_user):
+    """ Memoize a current_user method in the WSGI environ of the request,
+    so it is resolved once per request however many times it is called
+    """
+    @wraps(current_user)
+    def wrapper(self, request=None):
+        environ = getattr(request, 'environ', None)
+        if not isinstance(environ, dict):
+            return current_user(self, request)
+        memo = environ.get(CURRENT_USER_KEY)
+        if memo is not None and memo[0] is self:
+            return memo[1]
+        user = current_user(self, request)
+        environ[CURRENT_USER_KEY] = (self, user)
+        return user
+    return wrapper
+
+
 class Auth:
-    """ Class to manage the API authentication """
+    """ Class to manage the API authentication
+
+    current_user is memoized per request, including when subclasses
+    override it.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        """ Memoize the current_user override of a subclass """
+        super().__init_subclass__(**kwargs)
+        if 'current_user' in cls.__dict__:
+            cls.current_user = per_request(cls.__dict__['current_user'])
 
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
-        """ Method for validating if endpoint requires auth """
+        """ Method for validating if endpoint requires auth
+
+        excluded_paths is a list of paths or an ExcludedPaths compiled
+        by compile_excluded_paths.
+        """
         if path is None or excluded_paths is None or excluded_paths == []:
             return True
 
-        l_path = len(path)
-        if l_path == 0:
+        if len(path) == 0:
             return True
 
-        slash_path = True if path[l_path - 1] == '/' else False
-
-        tmp_path = path
-        if not slash_path:
-            tmp_path += '/'
-
-        for exc in excluded_paths:
-            l_exc = len(exc)
-            if l_exc == 0:
-                continue
-
-            if exc[l_exc - 1] != '*':
-                if tmp_path == exc:
-                    return False
-            else:
-                if exc[:-1] == path[:l_exc - 1]:
-                    return False
+        if not isinstance(excluded_paths, ExcludedPaths):
+            excluded_paths = compile_excluded_paths(tuple(excluded_paths))
 
-        return True
+        return not excluded_paths.is_excluded(path)
 
     def authorization_header(self, request=None) -> str:
         """ Method that handles authorization header """
@@ -45,6 +111,7 @@ class Auth:
 
         return request.headers.get("Authorization", None)
 
+    @per_request
     def current_user(self, request=None) -> TypeVar('User'):
         """ Validates current user """
         return None
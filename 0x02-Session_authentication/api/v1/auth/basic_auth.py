@@ -3,12 +3,76 @@
 """
 from api.v1.auth.auth import Auth
 from base64 import b64decode
+from collections import OrderedDict
+from hashlib import sha256
 from models.user import User
+from os import getenv
 from typing import TypeVar
+import threading
+import time
 
 
 class BasicAuth(Auth):
-    """ Basic Authentication Class """
+    """ Basic Authentication Class
+
+    Verified credentials are cached: the SHA-256 of an Authorization header
+    that authenticated a user maps to that user's ID for
+    BASIC_AUTH_CACHE_TTL seconds (LRU, at most BASIC_AUTH_CACHE_SIZE
+    entries). A cached entry is only used while the user still exists and
+    has the same password hash, so removals and password changes
+    invalidate it. The cache and its counters are shared by all the
+    instances of the process.
+    """
+    cache_hits = 0
+    cache_misses = 0
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self):
+        """Constructor"""
+        try:
+            self.cache_size = int(getenv("BASIC_AUTH_CACHE_SIZE", 1024))
+        except ValueError:
+            self.cache_size = 1024
+        try:
+            self.cache_ttl = float(getenv("BASIC_AUTH_CACHE_TTL", 300))
+        except ValueError:
+            self.cache_ttl = 300.0
+
+    def cache_info(self) -> dict:
+        """ Counters of the verified-credential cache """
+        return {"hits": self.cache_hits, "misses": self.cache_misses,
+                "size": len(self._cache), "max_size": self.cache_size}
+
+    def _cached_user(self, key: str) -> TypeVar('User'):
+        """ Returns the user cached for a header hash, if still valid """
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            user_id, pwd_hash, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+
+        user = User.get(user_id)
+        if user is None or user.password != pwd_hash:
+            with self._cache_lock:
+                self._cache.pop(key, None)
+            return None
+        return user
+
+    def _cache_user(self, key: str, user: TypeVar('User')) -> None:
+        """ Caches the user authenticated by a header hash """
+        if self.cache_size <= 0 or self.cache_ttl <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (user.id, user.password,
+                                time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
 
     def extract_base64_authorization_header(self,
                                             authorization_header: str) -> str:
@@ -93,9 +157,19 @@ class BasicAuth(Auth):
         """ overloads Auth and retrieves the User instance for a request """
         auth_header = self.authorization_header(request)
 
-        if not auth_header:
+        if not auth_header or not isinstance(auth_header, str):
             return None
 
+        key = sha256(auth_header.encode()).hexdigest()
+        user = self._cached_user(key)
+        with self._cache_lock:
+            if user is not None:
+                BasicAuth.cache_hits += 1
+            else:
+                BasicAuth.cache_misses += 1
+        if user is not None:
+            return user
+
         encoded = self.extract_base64_authorization_header(auth_header)
 
         if not encoded:
@@ -112,5 +186,7 @@ class BasicAuth(Auth):
             return None
 
         user = self.user_object_from_credentials(email, pwd)
+        if user is not None:
+            self._cache_user(key, user)
 
         return user
@@ -1,19 +1,36 @@
 #!/usr/bin/env python3
 """SessionDBAuth class"""
 from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_gc import start_session_sweeper
 from models.user_session import UserSession
-from datetime import datetime
+from datetime import datetime, timedelta
+from os import getenv
 
 
 class SessionDBAuth(SessionExpAuth):
-    """SessionDBAuth class"""
+    """SessionDBAuth class
+
+    Sessions are UserSession objects, looked up through the session_id
+    and user_id indexes of UserSession. Expired ones are removed every
+    SESSION_SWEEP_INTERVAL seconds (disabled by default, see session_gc).
+    """
+    def __init__(self):
+        """Constructor"""
+        super().__init__()
+        UserSession.load_from_file()
+        try:
+            sweep_interval = float(getenv("SESSION_SWEEP_INTERVAL", 0))
+        except ValueError:
+            sweep_interval = 0
+        start_session_sweeper(self.session_duration, sweep_interval)
+
     def create_session(self, user_id=None):
         """Create session"""
         session_id = super().create_session(user_id)
         if not session_id:
             return None
-        user_id = UserSession(user_id=user_id, session_id=session_id)
-        user_id.save()
+        user_session = UserSession(user_id=user_id, session_id=session_id)
+        user_session.save()
         return session_id
 
     def user_id_for_session_id(self, session_id=None):
@@ -22,10 +39,17 @@ class SessionDBAuth(SessionExpAuth):
             return None
         if not isinstance(session_id, str):
             return None
-        user_id = UserSession.get(session_id)
-        if not user_id:
+        user_sessions = UserSession.search({'session_id': session_id})
+        if not user_sessions:
             return None
-        return user_id
+        user_session = user_sessions[0]
+        if self.session_duration <= 0:
+            return user_session.user_id
+        expires_at = user_session.created_at + \
+            timedelta(seconds=self.session_duration)
+        if expires_at < datetime.utcnow():
+            return None
+        return user_session.user_id
 
     def destroy_session(self, request=None):
         """Destroy session"""
@@ -34,8 +58,23 @@ class SessionDBAuth(SessionExpAuth):
         session_id = self.session_cookie(request)
         if not session_id:
             return False
-        user_id = self.user_id_for_session_id(session_id)
-        if not user_id:
+        user_sessions = UserSession.search({'session_id': session_id})
+        if not user_sessions:
             return False
-        user_id.delete()
+        with UserSession.batch():
+            for user_session in user_sessions:
+                user_session.remove()
+        self.user_id_by_session_id.pop(session_id, None)
         return True
+
+    def destroy_user_sessions(self, user_id=None):
+        """Destroy every session of a user (log out everywhere)"""
+        if user_id is None or not isinstance(user_id, str):
+            return 0
+        user_sessions = UserSession.search({'user_id': user_id})
+        with UserSession.batch():
+            for user_session in user_sessions:
+                user_session.remove()
+                self.user_id_by_session_id.pop(user_session.session_id,
+                                               None)
+        return len(user_sessions)
@@ -1,12 +1,48 @@
 #!/usr/bin/env python3
 """Set session expiration"""
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import SessionStore
 from os import getenv
 from datetime import datetime
+import threading
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _shared_store(ttl: float, shards: int, reap_interval: float):
+    """ Session store of the process, created on first use
+
+    Every auth instance must see the same sessions: under
+    `python3 -m api.v1.app` the views import a second copy of the app
+    module, with its own auth instance.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if getenv("SESSION_STORE") == "sqlite":
+                from api.v1.auth.sqlite_session_store import \
+                    SQLiteSessionStore
+                _store = SQLiteSessionStore(
+                    getenv("SESSION_STORE_PATH", ".db_sessions.sqlite3"),
+                    ttl=ttl)
+            else:
+                _store = SessionStore(ttl=ttl, shards=shards)
+            _store.start_reaper(reap_interval)
+        return _store
 
 
 class SessionExpAuth(SessionAuth):
-    """Session expiration class"""
+    """Session expiration class
+
+    Sessions are kept in a SessionStore (SESSION_STORE_SHARDS shards)
+    that evicts them SESSION_DURATION seconds after creation; a reaper
+    thread sweeps it every SESSION_REAP_INTERVAL seconds.
+    With SESSION_STORE=sqlite, they are kept in a SQLiteSessionStore at
+    SESSION_STORE_PATH instead, shared by all the worker processes.
+    The store is shared by all the instances of the process.
+    """
     def __init__(self):
         """Constructor"""
         self.session_duration = getenv("SESSION_DURATION", 0)
@@ -14,6 +50,16 @@ class SessionExpAuth(SessionAuth):
             self.session_duration = int(self.session_duration)
         except Exception:
             self.session_duration = 0
+        try:
+            shards = int(getenv("SESSION_STORE_SHARDS", 16))
+        except ValueError:
+            shards = 16
+        try:
+            reap_interval = float(getenv("SESSION_REAP_INTERVAL", 60))
+        except ValueError:
+            reap_interval = 60.0
+        ttl = max(self.session_duration, 0)
+        self.user_id_by_session_id = _shared_store(ttl, shards, reap_interval)
 
     def create_session(self, user_id: str = None) -> str:
         """Create session for user id"""
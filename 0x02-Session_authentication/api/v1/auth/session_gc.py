@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Garbage collection of expired UserSession objects
+
+Usage: SESSION_DURATION=<seconds> python3 -m api.v1.auth.session_gc
+"""
+from datetime import datetime, timedelta
+from models.user_session import UserSession
+from os import getenv, path
+import logging
+import threading
+import time
+
+
+SESSION_FILES = (".db_UserSession.json", ".db_UserSession.journal")
+
+
+def _files_size() -> int:
+    """ Size on disk of the UserSession files of the file storage """
+    return sum(path.getsize(file_path) for file_path in SESSION_FILES
+               if path.exists(file_path))
+
+
+def sweep_expired_sessions(session_duration: int) -> dict:
+    """ Remove the sessions older than session_duration seconds
+
+    All removals are written at once. Returns the number of removed rows
+    and the number of bytes the UserSession files shrank by. In journal
+    mode the removals are appended to the journal, so the files only
+    shrink at the next compaction (and "bytes" can be negative).
+    """
+    if session_duration <= 0:
+        return {"rows": 0, "bytes": 0}
+
+    limit = datetime.utcnow() - timedelta(seconds=session_duration)
+    expired = [user_session for user_session in UserSession.all()
+               if user_session.created_at < limit]
+    size_before = _files_size()
+    with UserSession.batch():
+        for user_session in expired:
+            user_session.remove()
+    return {"rows": len(expired), "bytes": size_before - _files_size()}
+
+
+def start_session_sweeper(session_duration: int, interval: float) -> None:
+    """ Run sweep_expired_sessions every `interval` seconds in a daemon
+    thread
+    """
+    if session_duration <= 0 or interval <= 0:
+        return
+
+    def _run():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep_expired_sessions(session_duration)
+            except Exception:
+                # e.g. an I/O error: keep sweeping at the next interval
+                logging.getLogger(__name__).exception(
+                    "Expired session sweep failed")
+
+    threading.Thread(target=_run, name="session-sweeper",
+                     daemon=True).start()
+
+
+def main() -> None:
+    """ Sweep the expired sessions of .db_UserSession.json """
+    try:
+        session_duration = int(getenv("SESSION_DURATION", 0))
+    except ValueError:
+        session_duration = 0
+    UserSession.load_from_file()
+    result = sweep_expired_sessions(session_duration)
+    print("Removed {} expired sessions ({} bytes)".format(result["rows"],
+                                                          result["bytes"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+In-memory session store with expiry
+"""
+from collections.abc import MutableMapping
+from heapq import heappop, heappush
+import logging
+import threading
+import time
+
+
+class _Shard:
+    """ One lock-protected slice of a SessionStore """
+
+    def __init__(self):
+        """Constructor"""
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires_at = {}
+        self.heap = []
+
+
+class SessionStore(MutableMapping):
+    """ Session ID -> session mapping, sharded and expiring
+
+    Keys are spread over `shards` dicts, each with its own lock, so
+    concurrent writers rarely contend; reads don't take a lock. With a
+    `ttl` (seconds) > 0, every key expires `ttl` seconds after it was set:
+    expired keys are invisible to lookups and are evicted by reap(),
+    which pops them from a per-shard expiry heap in O(expired log n).
+    """
+
+    def __init__(self, ttl: float = 0, shards: int = 16):
+        """Constructor"""
+        self.ttl = ttl
+        self.expired = 0
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._reaper = None
+
+    def _shard(self, key) -> _Shard:
+        """ Shard holding a key """
+        return self._shards[hash(key) % len(self._shards)]
+
+    def __getitem__(self, key):
+        """ Value of a live key """
+        shard = self._shard(key)
+        value = shard.data[key]
+        if self.ttl > 0 and \
+                shard.expires_at.get(key, 0) <= time.monotonic():
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        """ Set a key, (re)starting its time to live """
+        shard = self._shard(key)
+        with shard.lock:
+            shard.data[key] = value
+            if self.ttl > 0:
+                expires_at = time.monotonic() + self.ttl
+                shard.expires_at[key] = expires_at
+                heappush(shard.heap, (expires_at, key))
+
+    def __delitem__(self, key):
+        """ Delete a key """
+        shard = self._shard(key)
+        with shard.lock:
+            del shard.data[key]
+            shard.expires_at.pop(key, None)
+
+    def __iter__(self):
+        """ Iterate over the keys (live or not yet reaped) """
+        for shard in self._shards:
+            yield from list(shard.data)
+
+    def __len__(self) -> int:
+        """ Number of keys (live or not yet reaped) """
+        return sum(len(shard.data) for shard in self._shards)
+
+    def __repr__(self) -> str:
+        """ Same representation as the dict it replaces """
+        return repr(dict(self.items()))
+
+    def reap(self) -> int:
+        """ Evict expired keys, return how many were evicted """
+        if self.ttl <= 0:
+            return 0
+        now = time.monotonic()
+        evicted = 0
+        for shard in self._shards:
+            with shard.lock:
+                while shard.heap and shard.heap[0][0] <= now:
+                    expires_at, key = heappop(shard.heap)
+                    # the heap keeps stale entries of re-set/deleted keys
+                    if shard.expires_at.get(key) != expires_at:
+                        continue
+                    del shard.expires_at[key]
+                    del shard.data[key]
+                    evicted += 1
+        self.expired += evicted
+        return evicted
+
+    def start_reaper(self, interval: float) -> None:
+        """ Run reap() every `interval` seconds in a daemon thread """
+        if self._reaper is not None or self.ttl <= 0 or interval <= 0:
+            return
+
+        def _run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reap()
+                except Exception:
+                    logging.getLogger(__name__).exception(
+                        "Session reaping failed")
+
+        self._reaper = threading.Thread(target=_run, name="session-reaper",
+                                        daemon=True)
+        self._reaper.start()
+
+    def stats(self) -> dict:
+        """ Live (unexpired) sessions and sessions evicted so far """
+        live = len(self)
+        if self.ttl > 0:
+            now = time.monotonic()
+            live = sum(1 for shard in self._shards
+                       for expires_at in list(shard.expires_at.values())
+                       if expires_at > now)
+        return {"live": live, "expired": self.expired,
+                "shards": len(self._shards)}
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Stateless session authentication with signed session IDs"""
+from api.v1.auth.session_exp_auth import SessionExpAuth
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from os import getenv
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+
+class SignedSessionAuth(SessionExpAuth):
+    """Signed session authentication class
+
+    The session ID carries the user ID, the expiry time and a random
+    nonce, signed with HMAC-SHA256 and the SESSION_SECRET key, so it is
+    verified without any session store. All workers must share the same
+    SESSION_SECRET, and SESSION_DURATION must be > 0: logged out session
+    IDs are kept in a revocation set until they expire. The set holds at
+    most SESSION_REVOKED_MAX unexpired session IDs; when it is full,
+    logouts fail rather than forget a revocation.
+
+    The revocation set is shared by the instances of a process, but not
+    by processes: a logged out session ID stays valid on the other
+    workers (e.g. gunicorn) until it expires.
+    """
+    revoked = {}
+    _revoked_lock = threading.Lock()
+
+    def __init__(self):
+        """Constructor"""
+        super().__init__()
+        secret = getenv("SESSION_SECRET")
+        if not secret:
+            raise ValueError("SESSION_SECRET must be set for "
+                             "signed_session_auth")
+        if self.session_duration <= 0:
+            raise ValueError("SESSION_DURATION must be > 0 for "
+                             "signed_session_auth")
+        self.secret = secret.encode()
+        try:
+            self.revoked_max = int(getenv("SESSION_REVOKED_MAX", 10000))
+        except ValueError:
+            self.revoked_max = 10000
+
+    def _sign(self, payload: str) -> str:
+        """Signature of a payload"""
+        digest = hmac.new(self.secret, payload.encode(), hashlib.sha256)
+        return urlsafe_b64encode(digest.digest()).decode().rstrip('=')
+
+    def _verify(self, session_id: str) -> (str, int):
+        """User ID and expiry of a well-signed session ID, else None"""
+        if session_id is None or not isinstance(session_id, str):
+            return None
+        payload, sep, signature = session_id.rpartition('.')
+        if not sep:
+            return None
+        if not hmac.compare_digest(self._sign(payload), signature):
+            return None
+        try:
+            padding = '=' * (-len(payload) % 4)
+            decoded = urlsafe_b64decode(payload + padding).decode()
+            user_id, expires_at, _ = decoded.rsplit(':', 2)
+            return user_id, int(expires_at)
+        except Exception:
+            return None
+
+    def create_session(self, user_id: str = None) -> str:
+        """Create a signed session ID for user id"""
+        if user_id is None:
+            return None
+        if not isinstance(user_id, str):
+            return None
+        expires_at = int(time.time()) + self.session_duration
+        # the nonce makes every session ID unique, so revoking one doesn't
+        # revoke the other sessions of the user
+        nonce = secrets.token_urlsafe(16)
+        payload = urlsafe_b64encode("{}:{}:{}".format(user_id, expires_at,
+                                                      nonce)
+                                    .encode()).decode().rstrip('=')
+        return "{}.{}".format(payload, self._sign(payload))
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """Retrieves user id from a signed session ID"""
+        verified = self._verify(session_id)
+        if verified is None:
+            return None
+        user_id, expires_at = verified
+        if expires_at <= time.time():
+            return None
+        if session_id in self.revoked:
+            return None
+        return user_id
+
+    def destroy_session(self, request=None):
+        """Destroy session: revoke its session ID
+
+        Fails if the revocation set is full of unexpired session IDs.
+        """
+        if request is None:
+            return False
+        session_id = self.session_cookie(request)
+        if not self.user_id_for_session_id(session_id):
+            return False
+        expires_at = self._verify(session_id)[1]
+        now = time.time()
+        with self._revoked_lock:
+            if len(self.revoked) >= self.revoked_max:
+                # only expired session IDs can be forgotten
+                expired = [revoked_id for revoked_id, revoked_until
+                           in self.revoked.items() if revoked_until <= now]
+                for revoked_id in expired:
+                    del self.revoked[revoked_id]
+                if len(self.revoked) >= self.revoked_max:
+                    return False
+            self.revoked[session_id] = expires_at
+        return True
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Session store shared by all the processes of a host, in SQLite
+"""
+from collections.abc import MutableMapping
+from datetime import datetime
+import logging
+import sqlite3
+import threading
+import time
+
+
+class SQLiteSessionStore(MutableMapping):
+    """ Session ID -> session mapping in a local SQLite database
+
+    Drop-in replacement of SessionStore for multi-process servers: every
+    worker opens the same database file, so a session created by one
+    worker is seen by all of them. The database runs in WAL mode, where
+    readers never wait for writers, and each thread has its own
+    connection, so lookups take no lock in the process either.
+
+    Values are a user ID, or a dict with "user_id" and "created_at" (as
+    stored by SessionExpAuth).
+    """
+
+    def __init__(self, db_path: str, ttl: float = 0):
+        """Constructor"""
+        self.db_path = db_path
+        self.ttl = ttl
+        self.expired = 0
+        self._local = threading.local()
+        self._reaper = None
+        self._conn().execute("CREATE TABLE IF NOT EXISTS sessions ("
+                             "session_id TEXT PRIMARY KEY, "
+                             "user_id TEXT, "
+                             "created_at REAL, "
+                             "expires_at REAL)")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS "
+                             "sessions_expires_at ON sessions (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """ Connection of the calling thread """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __getitem__(self, key):
+        """ Value of a live key """
+        if not isinstance(key, str):
+            raise KeyError(key)
+        row = self._conn().execute(
+            "SELECT user_id, created_at FROM sessions WHERE session_id = ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())).fetchone()
+        if row is None:
+            raise KeyError(key)
+        user_id, created_at = row
+        if created_at is None:
+            return user_id
+        return {"user_id": user_id,
+                "created_at": datetime.fromtimestamp(created_at)}
+
+    def __setitem__(self, key, value):
+        """ Set a key, (re)starting its time to live """
+        if isinstance(value, dict):
+            user_id = value.get("user_id")
+            created_at = value.get("created_at")
+            created_at = None if created_at is None else \
+                created_at.timestamp()
+        else:
+            user_id, created_at = value, None
+        expires_at = time.time() + self.ttl if self.ttl > 0 else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions "
+            "(session_id, user_id, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?)", (key, user_id, created_at, expires_at))
+
+    def __delitem__(self, key):
+        """ Delete a key """
+        cursor = self._conn().execute(
+            "DELETE FROM sessions WHERE session_id = ?", (key,))
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __iter__(self):
+        """ Iterate over the keys (live or not yet reaped) """
+        rows = self._conn().execute("SELECT session_id FROM sessions")
+        for row in rows.fetchall():
+            yield row[0]
+
+    def __len__(self) -> int:
+        """ Number of keys (live or not yet reaped) """
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def __repr__(self) -> str:
+        """ Same representation as the dict it replaces """
+        return repr(dict(self.items()))
+
+    def reap(self) -> int:
+        """ Evict expired keys, return how many were evicted """
+        if self.ttl <= 0:
+            return 0
+        cursor = self._conn().execute(
+            "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        self.expired += cursor.rowcount
+        return cursor.rowcount
+
+    def start_reaper(self, interval: float) -> None:
+        """ Run reap() every `interval` seconds in a daemon thread """
+        if self._reaper is not None or self.ttl <= 0 or interval <= 0:
+            return
+
+        def _run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reap()
+                except Exception:
+                    logging.getLogger(__name__).exception(
+                        "Session reaping failed")
+
+        self._reaper = threading.Thread(target=_run, name="session-reaper",
+                                        daemon=True)
+        self._reaper.start()
+
+    def stats(self) -> dict:
+        """ Live sessions and sessions evicted so far by this process """
+        live = self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE expires_at IS NULL "
+            "OR expires_at > ?", (time.time(),)).fetchone()[0]
+        return {"live": live, "expired": self.expired}
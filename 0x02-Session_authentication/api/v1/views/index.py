@@ -21,8 +21,11 @@ def stats() -> str:
       - the number of each objects
     """
     from models.user import User
+    from api.v1.app import auth
     stats = {}
     stats['users'] = User.count()
+    if hasattr(auth, 'cache_info'):
+        stats['auth_cache'] = auth.cache_info()
     return jsonify(stats)
 
 
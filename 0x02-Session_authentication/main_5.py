@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+""" Main 5: current_user hits the storage once per request
+"""
+from flask import Flask, request
+from api.v1.auth.session_auth import SessionAuth
+from models.user import User
+from os import environ
+
+environ.setdefault("SESSION_NAME", "_my_session_id")
+
+""" Create a user test """
+user = User()
+user.email = "bobmemo@hbtn.io"
+user.password = "fake pwd"
+user.save()
+
+""" Create a session ID """
+sa = SessionAuth()
+session_id = sa.create_session(user.id)
+
+""" Count the User.get calls """
+user_get_calls = 0
+user_get = User.get
+
+
+def counting_get(id):
+    """ User.get, counted """
+    global user_get_calls
+    user_get_calls += 1
+    return user_get(id)
+
+
+User.get = staticmethod(counting_get)
+
+""" Resolve the user 3 times on one request """
+app = Flask(__name__)
+cookie = "{}={}".format(environ["SESSION_NAME"], session_id)
+with app.test_request_context('/', headers={"Cookie": cookie}):
+    for _ in range(3):
+        assert sa.current_user(request).id == user.id
+print("3 current_user calls, {} User.get call(s)".format(user_get_calls))
+assert user_get_calls == 1
+
+""" A new request resolves the user again """
+with app.test_request_context('/', headers={"Cookie": cookie}):
+    sa.current_user(request)
+print("2 requests, {} User.get call(s)".format(user_get_calls))
+assert user_get_calls == 2
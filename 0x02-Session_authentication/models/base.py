@@ -3,26 +3,46 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
-import json
+from os import getenv
+from models.engine import new_storage
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+
+# Compact models: with DB_COMPACT_MODELS=1, Base and its subclasses are
+# slotted classes (no per-instance __dict__), see compact_slots()
+COMPACT = getenv("DB_COMPACT_MODELS", "0") == "1"
+
+storage = new_storage()
+
+
+def compact_slots(*names: str) -> tuple:
+    """ __slots__ of a Base subclass: its attribute names in compact mode,
+    nothing otherwise (attributes then live in the inherited __dict__)
+    """
+    return names if COMPACT else ()
 
 
 class Base():
     """ Base class
+
+    Objects are kept by the storage engine selected with DB_STORAGE (see
+    models.engine). Subclasses can declare `__indexes__` (tuple of
+    attribute names) to have equality searches on those attributes served
+    by an index instead of a scan of every stored object.
+
+    Subclasses declare their attributes with `__slots__ = compact_slots()`.
     """
+    __indexes__ = ()
+    if COMPACT:
+        __slots__ = ('id', 'created_at', 'updated_at')
+    else:
+        __slots__ = ('__dict__', '__weakref__')
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
             self.created_at = datetime.strptime(kwargs.get('created_at'),
@@ -44,11 +64,39 @@ class Base():
             return False
         return (self.id == other.id)
 
+    def __setattr__(self, name: str, value) -> None:
+        """ Set an attribute, keeping storage indexes up to date
+        """
+        if name in self.__class__.__indexes__:
+            storage.set_indexed(self, name, value)
+        else:
+            super().__setattr__(name, value)
+
+    @classmethod
+    def _slot_names(cls) -> tuple:
+        """ Names of the slots of the class, base classes first
+        """
+        names = cls.__dict__.get('_slot_names_cache')
+        if names is None:
+            names = tuple(name for klass in reversed(cls.__mro__)
+                          for name in klass.__dict__.get('__slots__', ())
+                          if name not in ('__dict__', '__weakref__'))
+            cls._slot_names_cache = names
+        return names
+
+    def _attributes(self) -> Iterable[tuple]:
+        """ (name, value) of every attribute set on the instance
+        """
+        if not COMPACT:
+            return self.__dict__.items()
+        return ((k, getattr(self, k)) for k in self.__class__._slot_names()
+                if hasattr(self, k))
+
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._attributes():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -61,52 +109,37 @@ class Base():
     def load_from_file(cls):
         """ Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        storage.load(cls)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        storage.persist(cls)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def batch(cls):
+        """ Unit of work: the save()/remove() calls made by this thread
+        inside the `with` block are written together when it exits
+        """
+        return storage.batch()
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        storage.save(self)
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        storage.remove(self)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return storage.count(cls)
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -118,20 +151,10 @@ class Base():
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return storage.get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        return storage.search(cls, attributes)
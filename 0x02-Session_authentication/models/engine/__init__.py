@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+""" Storage engines of the models
+"""
+from os import getenv
+
+
+def new_storage():
+    """ Return the storage engine selected by DB_STORAGE
+
+    - "file" (default): in-memory objects persisted to .db_<Class>.json
+    - "sqlite": shared SQLite database at DB_SQLITE_PATH
+    """
+    if getenv("DB_STORAGE", "file") == "sqlite":
+        from models.engine.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(getenv("DB_SQLITE_PATH", ".db.sqlite3"))
+    from models.engine.file_storage import FileStorage
+    return FileStorage()
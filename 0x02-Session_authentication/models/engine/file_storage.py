@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+""" FileStorage module: objects in memory, persisted to JSON files
+"""
+from contextlib import contextmanager
+from typing import TypeVar, List, Iterable
+from os import getenv, path
+from models.engine.storage import Storage
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+
+# DATA values are model instances, or the raw JSON dict of objects loaded
+# from file that nobody has accessed yet (see FileStorage._materialize)
+DATA = {}
+INDEXES = {}
+
+# Journal mode: save()/remove() append one record to .db_<Class>.journal
+# instead of rewriting .db_<Class>.json; a background thread compacts the
+# journal into a fresh snapshot every DB_COMPACT_INTERVAL seconds.
+JOURNAL = getenv("DB_JOURNAL", "0") == "1"
+try:
+    COMPACT_INTERVAL = float(getenv("DB_COMPACT_INTERVAL", 60))
+except ValueError:
+    COMPACT_INTERVAL = 60.0
+
+# Group commit: with DB_GROUP_COMMIT_MS > 0, writes are buffered and
+# flushed at most every DB_GROUP_COMMIT_MS milliseconds, or as soon as
+# DB_GROUP_COMMIT_SIZE writes are pending. DB_FSYNC=1 fsyncs every flush.
+try:
+    GROUP_COMMIT_MS = float(getenv("DB_GROUP_COMMIT_MS", 0))
+except ValueError:
+    GROUP_COMMIT_MS = 0.0
+try:
+    GROUP_COMMIT_SIZE = int(getenv("DB_GROUP_COMMIT_SIZE", 0))
+except ValueError:
+    GROUP_COMMIT_SIZE = 0
+FSYNC = getenv("DB_FSYNC", "0") == "1"
+
+
+class FileStorage(Storage):
+    """ Storage of objects in process memory (DATA), persisted to
+    .db_<Class>.json snapshots and optional .db_<Class>.journal files
+
+    Classes can declare `__indexes__` (tuple of attribute names) to get
+    a secondary hash index per attribute: equality searches on an indexed
+    attribute are dict lookups instead of a scan of every stored object.
+    """
+
+    def __init__(self):
+        """ Initialize the storage
+        """
+        self._lock = threading.RLock()
+        self._classes = {}
+        self._journaled = {}
+        self._compactor = None
+        self._pending = {}
+        self._n_pending = 0
+        self._flush_timer = None
+        self._batch = threading.local()
+        atexit.register(self.flush)
+
+    def _table(self, cls: type) -> dict:
+        """ Objects of a class by ID, creating its tables on first use
+        """
+        s_class = cls.__name__
+        objs = DATA.get(s_class)
+        if objs is None:
+            with self._lock:
+                self._classes[s_class] = cls
+                INDEXES.setdefault(s_class, {k: {} for k in cls.__indexes__})
+                objs = DATA.setdefault(s_class, {})
+        return objs
+
+    def _index_add(self, cls: type, obj) -> None:
+        """ Add an object to every secondary index of its class
+        """
+        indexes = INDEXES[cls.__name__]
+        obj_id = _field(obj, 'id')
+        for attr in cls.__indexes__:
+            try:
+                indexes[attr].setdefault(_field(obj, attr), {})[obj_id] = obj
+            except TypeError:
+                continue
+
+    def _index_discard(self, cls: type, obj) -> None:
+        """ Remove an object from every secondary index of its class
+        """
+        indexes = INDEXES[cls.__name__]
+        for attr in cls.__indexes__:
+            try:
+                value = _field(obj, attr)
+                bucket = indexes[attr].get(value)
+            except TypeError:
+                continue
+            if bucket is None:
+                continue
+            bucket.pop(_field(obj, 'id'), None)
+            if len(bucket) == 0:
+                del indexes[attr][value]
+
+    def _store(self, cls: type, obj) -> None:
+        """ Put an object in DATA and in the secondary indexes
+        """
+        objs = self._table(cls)
+        obj_id = _field(obj, 'id')
+        stored = objs.get(obj_id)
+        if stored is obj:
+            return
+        if stored is not None:
+            self._index_discard(cls, stored)
+        objs[obj_id] = obj
+        self._index_add(cls, obj)
+
+    def _unstore(self, cls: type, obj_id: str) -> bool:
+        """ Drop an object from DATA and from the secondary indexes
+        """
+        objs = self._table(cls)
+        stored = objs.get(obj_id)
+        if stored is None:
+            return False
+        self._index_discard(cls, stored)
+        del objs[obj_id]
+        return True
+
+    def _materialize(self, cls: type, obj) -> TypeVar('Base'):
+        """ Return the instance for a DATA value, building it on first
+        access if the value is still the raw JSON dict from file (None if
+        another thread removed it meanwhile)
+        """
+        if type(obj) is not dict:
+            return obj
+        s_class = cls.__name__
+        obj_id = obj.get('id')
+        with self._lock:
+            stored = DATA[s_class].get(obj_id)
+            if type(stored) is not dict:
+                return stored
+            instance = cls(**stored)
+            DATA[s_class][obj_id] = instance
+            for attr in cls.__indexes__:
+                try:
+                    bucket = INDEXES[s_class][attr].get(stored.get(attr))
+                except TypeError:
+                    continue
+                if bucket is not None and obj_id in bucket:
+                    bucket[obj_id] = instance
+            return instance
+
+    def set_indexed(self, obj: TypeVar('Base'), name: str, value) -> None:
+        """ Set an indexed attribute, moving a stored object to its new
+        index bucket
+        """
+        cls = obj.__class__
+        obj_id = getattr(obj, 'id', None)
+        if obj_id is None or self._table(cls).get(obj_id) is not obj:
+            object.__setattr__(obj, name, value)
+            return
+        with self._lock:
+            self._index_discard(cls, obj)
+            object.__setattr__(obj, name, value)
+            self._index_add(cls, obj)
+
+    def load(self, cls: type) -> None:
+        """ Load all objects of a class from file
+
+        The snapshot is loaded first, then the journal (if any) is
+        replayed on top of it. The snapshot is parsed incrementally and
+        objects stay raw dicts until they are first accessed.
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        with self._lock:
+            self._classes[s_class] = cls
+            DATA[s_class] = {}
+            INDEXES[s_class] = {k: {} for k in cls.__indexes__}
+            self._journaled[s_class] = 0
+            if path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    for obj_id, obj_json in _iter_json_object(f):
+                        obj_json.setdefault('id', obj_id)
+                        self._store(cls, obj_json)
+            self._replay_journal(cls)
+
+    def _replay_journal(self, cls: type) -> None:
+        """ Apply the records of the journal of a class to DATA
+
+        A torn record (the last one, written during a crash) is cut off
+        the journal, so the records appended after it are not lost on
+        the next replay.
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        if not path.exists(journal_path):
+            return
+
+        with open(journal_path, 'rb+') as f:
+            good_offset = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # torn write of the last record before a crash
+                    f.truncate(good_offset)
+                    break
+                if not line.endswith(b"\n"):
+                    # complete record, but its newline was not written
+                    f.write(b"\n")
+                good_offset += len(line)
+                if record.get('op') == 'save':
+                    self._store(cls, record.get('obj'))
+                elif record.get('op') == 'remove':
+                    self._unstore(cls, record.get('id'))
+                self._journaled[s_class] += 1
+
+    def persist(self, cls: type) -> None:
+        """ Save all objects of a class to file
+
+        The snapshot is written to a temporary file and renamed over the
+        old one, then the journal it supersedes is truncated.
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        journal_path = ".db_{}.journal".format(s_class)
+        with self._lock:
+            objs_json = {}
+            for obj_id, obj in self._table(cls).items():
+                if type(obj) is dict:
+                    objs_json[obj_id] = obj
+                else:
+                    objs_json[obj_id] = obj.to_json(True)
+
+            tmp_path = "{}.tmp".format(file_path)
+            with open(tmp_path, 'w') as f:
+                json.dump(objs_json, f)
+                _sync(f)
+            os.replace(tmp_path, file_path)
+            if path.exists(journal_path):
+                open(journal_path, 'w').close()
+            self._journaled[s_class] = 0
+
+    def append_to_journal(self, cls: type, records: List[dict]) -> None:
+        """ Append records to the journal of a class
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        with self._lock:
+            with open(journal_path, 'a') as f:
+                f.write("".join(json.dumps(r) + "\n" for r in records))
+                _sync(f)
+            self._journaled[s_class] = \
+                self._journaled.get(s_class, 0) + len(records)
+        self.start_compactor()
+
+    def _write(self, cls: type, record: dict) -> None:
+        """ Queue one write and flush it unless it can be coalesced
+
+        Writes are deferred while the calling thread is inside batch(),
+        or up to the group commit window when it is enabled.
+        """
+        with self._lock:
+            records = self._pending.setdefault(cls.__name__, [])
+            if JOURNAL:
+                records.append(record)
+            self._n_pending += 1
+            if getattr(self._batch, 'depth', 0) > 0:
+                return
+            if GROUP_COMMIT_MS > 0 and (GROUP_COMMIT_SIZE <= 0 or
+                                        self._n_pending < GROUP_COMMIT_SIZE):
+                self._schedule_flush()
+                return
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """ Unit of work: every save()/remove() made by this thread inside
+        the block is written with a single flush when the block exits
+        """
+        self._batch.depth = getattr(self._batch, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            self._batch.depth -= 1
+            if self._batch.depth == 0:
+                self.flush()
+
+    def flush(self) -> None:
+        """ Write every pending change to disk
+        """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            pending = dict(self._pending)
+            self._pending.clear()
+            self._n_pending = 0
+            for s_class, records in pending.items():
+                if JOURNAL:
+                    self.append_to_journal(self._classes[s_class], records)
+                else:
+                    self.persist(self._classes[s_class])
+
+    def _schedule_flush(self) -> None:
+        """ Arm the group commit timer if it is not already running
+        """
+        if self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(GROUP_COMMIT_MS / 1000.0,
+                                            self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def compact(self) -> None:
+        """ Fold the journal of every class into a fresh snapshot
+        """
+        with self._lock:
+            for s_class, n_records in list(self._journaled.items()):
+                if n_records > 0:
+                    self.persist(self._classes[s_class])
+
+    def start_compactor(self) -> None:
+        """ Start the background compaction thread (once per process)
+        """
+        if self._compactor is not None or COMPACT_INTERVAL <= 0:
+            return
+        with self._lock:
+            if self._compactor is not None:
+                return
+
+            def _run():
+                while True:
+                    time.sleep(COMPACT_INTERVAL)
+                    try:
+                        self.compact()
+                    except Exception:
+                        # a dead compactor lets the journals grow forever
+                        logging.getLogger(__name__).exception(
+                            "Journal compaction failed")
+
+            self._compactor = threading.Thread(target=_run,
+                                               name="db-compactor",
+                                               daemon=True)
+            self._compactor.start()
+
+    def save(self, obj: TypeVar('Base')) -> None:
+        """ Save an object
+        """
+        cls = obj.__class__
+        with self._lock:
+            self._store(cls, obj)
+            self._write(cls, {'op': 'save', 'obj': obj.to_json(True)}
+                        if JOURNAL else None)
+
+    def remove(self, obj: TypeVar('Base')) -> None:
+        """ Remove an object
+        """
+        cls = obj.__class__
+        with self._lock:
+            if not self._unstore(cls, obj.id):
+                return
+            self._write(cls, {'op': 'remove', 'id': obj.id})
+
+    def count(self, cls: type) -> int:
+        """ Count all objects of a class
+        """
+        return len(self._table(cls))
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        return self._materialize(cls, self._table(cls).get(id))
+
+    def search(self, cls: type, attributes: dict) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+
+        The first indexed attribute narrows the candidates with a dict
+        lookup; the remaining attributes are checked on those candidates.
+        """
+        def _search(obj):
+            if len(attributes) == 0:
+                return True
+            for k, v in attributes.items():
+                if (getattr(obj, k) != v):
+                    return False
+            return True
+
+        # list() snapshots in one step: other threads may write meanwhile
+        candidates = None
+        for k, v in attributes.items():
+            if k not in cls.__indexes__:
+                continue
+            try:
+                bucket = INDEXES[cls.__name__][k].get(v)
+            except TypeError:
+                continue
+            if bucket is None:
+                return []
+            candidates = list(bucket.values())
+            break
+        if candidates is None:
+            candidates = list(self._table(cls).values())
+
+        candidates = [self._materialize(cls, obj) for obj in candidates]
+        # objects removed since the snapshot materialize to None
+        return [obj for obj in candidates
+                if obj is not None and _search(obj)]
+
+
+def _field(obj, attr: str):
+    """ Attribute of a DATA value, whether instance or raw JSON dict
+    """
+    if type(obj) is dict:
+        return obj.get(attr)
+    return getattr(obj, attr, None)
+
+
+def _sync(f) -> None:
+    """ Force a written file to stable storage when DB_FSYNC is set
+    """
+    if FSYNC:
+        f.flush()
+        os.fsync(f.fileno())
+
+
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+def _iter_json_object(f, chunk_size: int = 1 << 16) -> Iterable[tuple]:
+    """ Yield the (key, value) pairs of the top-level JSON object of a
+    file, reading it chunk by chunk instead of all at once
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def _token():
+        """ Skip whitespace, then return the next character ('' at EOF)
+        """
+        nonlocal buf, pos, eof
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\n\r":
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos:pos + 1]
+            buf, pos = f.read(chunk_size), 0
+            eof = buf == ""
+
+    def _value():
+        """ Decode the next JSON value, reading more input if it is cut
+        """
+        nonlocal buf, pos, eof
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # a number cut by the chunk boundary decodes as a shorter
+                # number ("-2500." as -2500): accept the value only if
+                # the character after it can't continue it
+                if eof or (end < len(buf) and buf[end] not in _NUMBER_CHARS):
+                    pos = end
+                    return value
+            except ValueError:
+                if eof:
+                    raise
+            more = f.read(chunk_size)
+            eof = more == ""
+            buf, pos = buf[pos:] + more, 0
+
+    if _token() == "":
+        return
+    if _token() != "{":
+        raise ValueError("Expected a JSON object")
+    pos += 1
+    if _token() == "}":
+        return
+    while True:
+        key = _value()
+        if _token() != ":":
+            raise ValueError("Expected ':' after key {}".format(key))
+        pos += 1
+        _token()
+        yield key, _value()
+        sep = _token()
+        pos += 1
+        if sep == "}":
+            return
+        if sep != ",":
+            raise ValueError("Expected ',' or '}'")
+        _token()
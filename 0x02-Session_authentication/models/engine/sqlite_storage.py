@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+""" SQLiteStorage module: objects in a SQLite database shared by processes
+"""
+from contextlib import contextmanager
+from typing import TypeVar, List
+from os import getenv, path
+from models.engine.file_storage import _iter_json_object
+from models.engine.storage import Storage
+import json
+import sqlite3
+import threading
+
+
+FSYNC = getenv("DB_FSYNC", "0") == "1"
+
+
+class SQLiteStorage(Storage):
+    """ Storage of objects in a SQLite database in WAL mode
+
+    One table per class: `id` primary key, the JSON serialization of the
+    object in `data`, and one indexed `idx_<attr>` column per attribute
+    of the class `__indexes__`. Every process (e.g. gunicorn workers)
+    reads and writes the same file, so they all see the same objects.
+    Each thread uses its own connection; statements are constant SQL
+    with parameters, so sqlite3 reuses the prepared statements.
+    """
+
+    def __init__(self, db_path: str):
+        """ Initialize the storage on a database file
+        """
+        self._path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sql = {}
+
+    def _conn(self) -> sqlite3.Connection:
+        """ Connection of the calling thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous={}".format(
+                "FULL" if FSYNC else "NORMAL"))
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    def _statements(self, cls: type) -> dict:
+        """ SQL of a class, creating its table and indexes on first use
+        """
+        s_class = cls.__name__
+        sql = self._sql.get(s_class)
+        if sql is not None:
+            return sql
+
+        with self._lock:
+            conn = self._conn()
+            table = '"{}"'.format(s_class)
+            columns = ['"idx_{}"'.format(attr) for attr in cls.__indexes__]
+            conn.execute("CREATE TABLE IF NOT EXISTS {} "
+                         "(id TEXT PRIMARY KEY, data TEXT NOT NULL{})"
+                         .format(table, "".join(", " + c for c in columns)))
+            existing = {row[1] for row in
+                        conn.execute("PRAGMA table_info({})".format(table))}
+            for attr, column in zip(cls.__indexes__, columns):
+                if "idx_{}".format(attr) not in existing:
+                    conn.execute("ALTER TABLE {} ADD COLUMN {}"
+                                 .format(table, column))
+                    conn.execute("UPDATE {} SET {} = json_extract(data, ?)"
+                                 .format(table, column),
+                                 ("$.{}".format(attr),))
+                conn.execute('CREATE INDEX IF NOT EXISTS "{}_{}" ON {} ({})'
+                             .format(s_class, attr, table, column))
+
+            sql = {
+                'save': "INSERT OR REPLACE INTO {} (id, data{}) VALUES "
+                        "(?, ?{})".format(table,
+                                          "".join(", " + c for c in columns),
+                                          ", ?" * len(columns)),
+                'remove': "DELETE FROM {} WHERE id = ?".format(table),
+                'get': "SELECT data FROM {} WHERE id = ?".format(table),
+                'count': "SELECT COUNT(*) FROM {}".format(table),
+                'all': "SELECT data FROM {}".format(table),
+            }
+            self._sql[s_class] = sql
+            return sql
+
+    def load(self, cls: type) -> None:
+        """ Create the table of a class if needed
+
+        The first time a class is loaded, the objects of the file storage
+        (.db_<Class>.json and its journal), if any, are imported, so
+        switching DB_STORAGE from file to sqlite keeps the data.
+        """
+        self._statements(cls)
+        self._import_files(cls)
+
+    def _import_files(self, cls: type) -> None:
+        """ Import the file storage objects of a class, once per database
+        """
+        s_class = cls.__name__
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS "_imported" '
+                     '(class TEXT PRIMARY KEY)')
+        with self.batch():
+            if conn.execute('SELECT 1 FROM "_imported" WHERE class = ?',
+                            (s_class,)).fetchone() is not None:
+                return
+            objs = {}
+            file_path = ".db_{}.json".format(s_class)
+            if path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    for obj_id, obj_json in _iter_json_object(f):
+                        obj_json.setdefault('id', obj_id)
+                        objs[obj_id] = obj_json
+            journal_path = ".db_{}.journal".format(s_class)
+            if path.exists(journal_path):
+                with open(journal_path, 'r') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            break
+                        if record.get('op') == 'save':
+                            obj_json = record.get('obj')
+                            objs[obj_json.get('id')] = obj_json
+                        elif record.get('op') == 'remove':
+                            objs.pop(record.get('id'), None)
+            for obj_json in objs.values():
+                self.save(cls(**obj_json))
+            conn.execute('INSERT INTO "_imported" (class) VALUES (?)',
+                         (s_class,))
+
+    def persist(self, cls: type) -> None:
+        """ Nothing to do: every write is already committed
+        """
+        pass
+
+    @contextmanager
+    def batch(self):
+        """ Run the writes of the block in one transaction, committed when
+        the block exits and rolled back if it raises
+        """
+        conn = self._conn()
+        if self._local.depth > 0:
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        self._local.depth = 1
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def save(self, obj: TypeVar('Base')) -> None:
+        """ Insert or update an object
+        """
+        cls = obj.__class__
+        sql = self._statements(cls)
+        values = [obj.id, json.dumps(obj.to_json(True))]
+        values.extend(_column(getattr(obj, attr, None))
+                      for attr in cls.__indexes__)
+        self._conn().execute(sql['save'], values)
+
+    def remove(self, obj: TypeVar('Base')) -> None:
+        """ Delete an object
+        """
+        sql = self._statements(obj.__class__)
+        self._conn().execute(sql['remove'], (obj.id,))
+
+    def count(self, cls: type) -> int:
+        """ Count all objects of a class
+        """
+        sql = self._statements(cls)
+        return self._conn().execute(sql['count']).fetchone()[0]
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        sql = self._statements(cls)
+        row = self._conn().execute(sql['get'], (id,)).fetchone()
+        if row is None:
+            return None
+        return cls(**json.loads(row[0]))
+
+    def search(self, cls: type, attributes: dict) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+
+        `id` and indexed attributes are matched by SQLite through the
+        indexes; the other attributes are checked on the rows it returns.
+        """
+        sql = self._statements(cls)
+        clauses = []
+        params = []
+        for k, v in attributes.items():
+            if _column(v) is not v:
+                continue
+            if k == 'id':
+                clauses.append("id = ?")
+            elif k in cls.__indexes__:
+                clauses.append('"idx_{}" IS ?'.format(k))
+            else:
+                continue
+            params.append(v)
+
+        query = sql['all']
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        result = []
+        for row in self._conn().execute(query, params):
+            obj = cls(**json.loads(row[0]))
+            if all(getattr(obj, k) == v for k, v in attributes.items()):
+                result.append(obj)
+        return result
+
+
+def _column(value):
+    """ Value stored in an index column: scalars as is, None otherwise
+    """
+    if value is None or type(value) in (str, int, float):
+        return value
+    return None
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+""" Storage module: interface of the storage engines
+"""
+from contextlib import contextmanager
+from typing import TypeVar, List
+
+
+class Storage():
+    """ Storage engine interface used by models.base.Base
+
+    Every method receives the model class (or instance) it works on, so
+    one engine serves all the models.
+    """
+
+    def load(self, cls: type) -> None:
+        """ Prepare the storage of a class (load it from disk if needed)
+        """
+        raise NotImplementedError
+
+    def persist(self, cls: type) -> None:
+        """ Write all objects of a class to durable storage
+        """
+        raise NotImplementedError
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ Return one object by ID, None if not found
+        """
+        raise NotImplementedError
+
+    def search(self, cls: type, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return all objects with matching attributes
+        """
+        raise NotImplementedError
+
+    def count(self, cls: type) -> int:
+        """ Count all objects of a class
+        """
+        raise NotImplementedError
+
+    def save(self, obj: TypeVar('Base')) -> None:
+        """ Insert or update an object
+        """
+        raise NotImplementedError
+
+    def remove(self, obj: TypeVar('Base')) -> None:
+        """ Delete an object
+        """
+        raise NotImplementedError
+
+    def set_indexed(self, obj: TypeVar('Base'), name: str, value) -> None:
+        """ Set an indexed attribute of an object
+        """
+        object.__setattr__(obj, name, value)
+
+    @contextmanager
+    def batch(self):
+        """ Group the writes of the block into one durable write
+        """
+        yield
+
+    def flush(self) -> None:
+        """ Write pending changes, if any
+        """
+        pass
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """User Session class"""
-from models.base import Base
+from models.base import Base, compact_slots
 
 
 class UserSession(Base):
     """UserSession class"""
+    __slots__ = compact_slots('user_id', 'session_id')
+    __indexes__ = ('session_id', 'user_id')
+
     def __init__(self, *args: list, **kwargs: dict):
         """Constructor"""
         super().__init__(*args, **kwargs)
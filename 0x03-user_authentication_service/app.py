@@ -9,6 +9,12 @@ AUTH = Auth()
 app = Flask(__name__)
 
 
+@app.teardown_appcontext
+def end_request(exception=None) -> None:
+    """Releases the request's database session"""
+    AUTH.end_request()
+
+
 @app.route("/")
 def welcome():
     """Returns a welcome message"""
@@ -2,24 +2,45 @@
 """Implements authentication features"""
 
 import bcrypt
+import os
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from db import DB
 from user import User
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 from typing import Optional
 
 
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
 def _hash_password(password: str) -> bytes:
-    """Hashes the given password using bcrypt
+    """Hashes the given password using bcrypt, with a cost of BCRYPT_ROUNDS
 
     Return:
          (bytes) salted hash of the password
     """
     if isinstance(password, str):
-        hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+        salt = bcrypt.gensalt(BCRYPT_ROUNDS)
+        hash = bcrypt.hashpw(password.encode(), salt)
         return hash
 
 
+def _needs_rehash(hashed_password: bytes) -> bool:
+    """Checks if a hash was made with a cost lower than BCRYPT_ROUNDS
+
+    The cost is read from the hash itself ("$2b$<cost>$...").
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode()
+    try:
+        return int(hashed_password.split(b"$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
 def _generate_uuid() -> str:
     """Returns a string uuid4"""
     return str(uuid.uuid4())
@@ -30,6 +51,34 @@ class Auth:
 
     def __init__(self):
         self._db = DB()
+        self._rehash_lock = threading.Lock()
+        self._rehash_pending = set()
+        self._rehash_executor = None
+
+    def _rehash(self, user_id: int, old_hash: bytes, password: str) -> None:
+        """Replaces a user's password hash by one at the current cost"""
+        try:
+            self._db.replace_password_hash(
+                user_id, old_hash, _hash_password(password))
+        finally:
+            with self._rehash_lock:
+                self._rehash_pending.discard(user_id)
+
+    def _schedule_rehash(self, user: User, password: str) -> None:
+        """Rehashes a user's password in the background, once at a time"""
+        with self._rehash_lock:
+            if user.id in self._rehash_pending:
+                return
+            self._rehash_pending.add(user.id)
+            if self._rehash_executor is None:
+                self._rehash_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="password-rehash")
+        self._rehash_executor.submit(
+            self._rehash, user.id, user.hashed_password, password)
+
+    def end_request(self) -> None:
+        """Releases the database session of the current request"""
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """Saves a user to the database.
@@ -42,21 +91,33 @@ class Auth:
             raise ValueError(f"User {email} already exists")
         except NoResultFound:
             pwd = _hash_password(password)
-            user = self._db.add_user(email, pwd)
+            try:
+                user = self._db.add_user(email, pwd)
+            except IntegrityError:
+                # registered concurrently since find_user_by
+                raise ValueError(f"User {email} already exists")
             return user
 
     def valid_login(self, email: str, password: str) -> bool:
         """Check the passed credentials against registered users
 
+        Passwords hashed with a cost lower than BCRYPT_ROUNDS are rehashed
+        in the background once validated, without delaying the login.
+
         Return:
             True if email exists with password
         """
         if isinstance(email, str) and isinstance(password, str):
             try:
                 user = self._db.find_user_by(email=email)
-                return bcrypt.checkpw(password.encode(), user.hashed_password)
+                if not bcrypt.checkpw(password.encode(),
+                                      user.hashed_password):
+                    return False
             except Exception:
                 return False
+            if _needs_rehash(user.hashed_password):
+                self._schedule_rehash(user, password)
+            return True
 
     def create_session(self, email: str) -> Optional[str]:
         """Creates a session for the user with the given email
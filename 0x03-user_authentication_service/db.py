@@ -1,45 +1,88 @@
 #!/usr/bin/env python3
 """DB module"""
 
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.pool import QueuePool
 from user import Base, User
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Puts every new SQLite connection in WAL mode
+
+    In WAL mode readers don't block the writer (nor the writer readers),
+    and busy_timeout makes writers wait for each other instead of failing.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
 class DB:
-    """DB class"""
+    """DB class
+
+    Each thread gets its own session (scoped_session), and sessions borrow
+    connections from a pool tuned by DB_POOL_SIZE (default 5),
+    DB_MAX_OVERFLOW (default 10) and DB_POOL_TIMEOUT (seconds, default 30).
+    Connections are checked with a ping before being handed out. Call
+    remove_session() when a request is done to release its session.
+    """
 
     def __init__(self) -> None:
         """Initialize a new DB instance"""
         self._engine = create_engine(
             "sqlite:///a.db",
+            poolclass=QueuePool,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_pre_ping=True,
+            # pooled connections move between threads, but a connection
+            # is only used by one session (so one thread) at a time
+            connect_args={"check_same_thread": False},
         )
+        event.listen(self._engine, "connect", _set_sqlite_pragmas)
         Base.metadata.drop_all(self._engine)
         Base.metadata.create_all(self._engine)
-        self.__session = None
+        self.__session_factory = sessionmaker(bind=self._engine)
+        self.__session = scoped_session(self.__session_factory)
 
     @property
     def _session(self) -> Session:
-        """Memoized session object"""
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        """Session object of the calling thread"""
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """Closes the session of the calling thread
+
+        Its connection goes back to the pool, and any transaction left
+        open (e.g. by a failed commit) is rolled back.
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """Saves a user to the database
 
+        Raises IntegrityError if the email is already registered.
+
         Return:
             the saved User
         """
         if email and hashed_password:
             user = User(email=email, hashed_password=hashed_password)
             self._session.add(user)
-            self._session.commit()
+            try:
+                self._session.commit()
+            except IntegrityError:
+                self._session.rollback()
+                raise
             return user
 
     def find_user_by(self, **kwargs) -> User:
@@ -63,4 +106,23 @@ class DB:
             else:
                 raise ValueError
         self._session.commit()
-        
\ No newline at end of file
+
+    def replace_password_hash(self, user_id: int, old_hash: bytes,
+                              new_hash: bytes) -> bool:
+        """Replaces a user's password hash, unless it changed meanwhile
+
+        Runs in its own session, so it can be called from another thread.
+
+        Return:
+            True if the hash was replaced
+        """
+        session = self.__session_factory()
+        try:
+            count = session.query(User).filter_by(
+                id=user_id, hashed_password=old_hash,
+            ).update({"hashed_password": new_hash},
+                     synchronize_session=False)
+            session.commit()
+            return count > 0
+        finally:
+            session.close()
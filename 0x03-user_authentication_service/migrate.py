@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Adds the indexes of the User model to an existing database
+
+Usage: python3 migrate.py [database URL, default sqlite:///a.db]
+"""
+
+import sys
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from user import User
+
+
+def duplicates(connection, column: str) -> list:
+    """Returns the non-NULL values of `column` held by several users"""
+    rows = connection.execute(text(
+        f"SELECT {column}, COUNT(*) FROM users WHERE {column} IS NOT NULL "
+        f"GROUP BY {column} HAVING COUNT(*) > 1"
+    ))
+    return rows.fetchall()
+
+
+def migrate(url: str = "sqlite:///a.db") -> bool:
+    """Creates the missing indexes of the users table
+
+    A unique index can't be created while the column holds duplicates:
+    they are reported and the index is skipped.
+
+    Return:
+        True if all the indexes exist
+    """
+    engine = create_engine(url)
+    complete = True
+    for index in User.__table__.indexes:
+        columns = ", ".join(column.name for column in index.columns)
+        unique = "UNIQUE " if index.unique else ""
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE {unique}INDEX IF NOT EXISTS {index.name} "
+                    f"ON users ({columns})"
+                ))
+            print(f"{index.name}: ok")
+        except IntegrityError:
+            complete = False
+            with engine.connect() as connection:
+                rows = duplicates(connection, columns)
+            print(f"{index.name}: skipped, duplicate values:")
+            for value, count in rows:
+                print(f"    {value!r} ({count} users)")
+    return complete
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "sqlite:///a.db"
+    sys.exit(0 if migrate(url) else 1)
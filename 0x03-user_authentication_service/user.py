@@ -9,11 +9,17 @@ Base = declarative_base()
 
 
 class User(Base):
-    """SQLAlchemy model for the users table."""
+    """SQLAlchemy model for the users table.
+
+    email, session_id and reset_token are looked up on every login,
+    profile view, logout and password reset, so each has a unique index
+    (several NULLs are allowed). Run migrate.py to add the indexes to an
+    existing database.
+    """
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True, nullable=False)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True, index=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250), nullable=True)
-    reset_token = Column(String(250), nullable=True)
+    session_id = Column(String(250), nullable=True, unique=True, index=True)
+    reset_token = Column(String(250), nullable=True, unique=True, index=True)